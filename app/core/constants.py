@@ -0,0 +1 @@
+DEFAULT_PROFILE = "default"
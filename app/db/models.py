@@ -5,6 +5,7 @@ from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import enum
 from app.db.base import Base
+from app.core.constants import DEFAULT_PROFILE
 
 class JobStatus(str, enum.Enum):
     PENDING = "pending"
@@ -29,7 +30,7 @@ class Job(Base):
     status = Column(String, default=JobStatus.PENDING.value)
     input_url = Column(Text, nullable=False)
     output_url = Column(Text, nullable=True)
-    profile_name = Column(String, nullable=False)
+    profile_name = Column(String, nullable=False, default=DEFAULT_PROFILE)
     profile_config = Column(JSON, nullable=True)
     
     # Metrics
@@ -0,0 +1,356 @@
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+from app.engine.ir import (
+    FilterGraphPlan,
+    FilterNode,
+    Inset,
+    PlanValidationError,
+    Product,
+    RandInt,
+    Slot,
+    StepIR,
+    Sum,
+)
+from app.engine.profiles import PROFILES, STEP_REGISTRY
+
+PLANAR_YUV = frozenset({
+    'gray', 'yuv410p', 'yuv411p', 'yuv420p', 'yuv422p', 'yuv440p', 'yuv444p',
+    'yuvj420p', 'yuvj422p', 'yuvj440p', 'yuvj444p',
+})
+
+@dataclass(frozen=True)
+class FilterSpec:
+    params: FrozenSet[str]
+    # Per-pixel filters that keep the frame size, so a crop can run before them.
+    pointwise: bool = False
+    # Pixel formats the filter accepts; None means any.
+    pix_fmts: Optional[FrozenSet[str]] = None
+    # Allowed (low, high) per numeric param.
+    ranges: Tuple[Tuple[str, float, float], ...] = ()
+    # Numeric params that ffmpeg only accepts as integers.
+    integer_params: FrozenSet[str] = frozenset()
+    # Gives the same picture (up to rounding) whether a format conversion
+    # runs before or after it, so a format node may move across it.
+    format_independent: bool = False
+
+FILTER_SPECS: Dict[str, FilterSpec] = {
+    'crop': FilterSpec(params=frozenset({'w', 'h', 'x', 'y', 'exact'})),
+    'eq': FilterSpec(
+        params=frozenset({'brightness', 'contrast', 'saturation', 'gamma'}),
+        pointwise=True,
+        pix_fmts=PLANAR_YUV,
+        ranges=(('brightness', -1.0, 1.0), ('contrast', -1000.0, 1000.0),
+                ('saturation', 0.0, 3.0), ('gamma', 0.1, 10.0)),
+        format_independent=True,
+    ),
+    'noise': FilterSpec(
+        params=frozenset({'alls', 'allf'}),
+        pointwise=True,
+        pix_fmts=PLANAR_YUV | {'gbrp'},
+        ranges=(('alls', 0, 100),),
+        integer_params=frozenset({'alls'}),
+    ),
+    'format': FilterSpec(params=frozenset({'pix_fmts'})),
+}
+
+EQ_DEFAULTS = {'brightness': 0.0, 'contrast': 1.0, 'saturation': 1.0, 'gamma': 1.0}
+
+
+def _interval(value: Any) -> Optional[Tuple[float, float]]:
+    """Bounds of a numeric value over all slot samples, if they can be derived."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value, value
+    if isinstance(value, Slot):
+        return value.sampler.low, value.sampler.high
+    if isinstance(value, Sum):
+        bounds = [_interval(t) for t in value.terms]
+        if None in bounds:
+            return None
+        return sum(b[0] for b in bounds), sum(b[1] for b in bounds)
+    if isinstance(value, Product):
+        lo, hi = 1, 1
+        for factor in value.factors:
+            bounds = _interval(factor)
+            if bounds is None:
+                return None
+            corners = [lo * bounds[0], lo * bounds[1], hi * bounds[0], hi * bounds[1]]
+            lo, hi = min(corners), max(corners)
+        return lo, hi
+    return None
+
+
+def _is_integral(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer()):
+        return True
+    if isinstance(value, Slot):
+        return isinstance(value.sampler, RandInt)
+    if isinstance(value, Sum):
+        return all(_is_integral(t) for t in value.terms)
+    if isinstance(value, Product):
+        return all(_is_integral(f) for f in value.factors)
+    return False
+
+
+def check_ranges(node: FilterNode):
+    for name, low, high in FILTER_SPECS[node.name].ranges:
+        if name not in node.params:
+            continue
+        bounds = _interval(node.params[name])
+        if bounds is None:
+            raise PlanValidationError(
+                f"Filter '{node.name}': {name} must be numeric, got {node.params[name]!r}"
+            )
+        if bounds[0] < low or bounds[1] > high:
+            raise PlanValidationError(
+                f"Filter '{node.name}': {name} range {bounds} outside [{low}, {high}]"
+            )
+    for name in FILTER_SPECS[node.name].integer_params:
+        if name in node.params and not _is_integral(node.params[name]):
+            raise PlanValidationError(
+                f"Filter '{node.name}': {name} must be an integer, got {node.params[name]!r}"
+            )
+
+
+def validate_plan(plan: FilterGraphPlan):
+    for node in plan.filters:
+        spec = FILTER_SPECS.get(node.name)
+        if spec is None:
+            raise PlanValidationError(f"Unknown filter '{node.name}'")
+        unknown = set(node.params) - spec.params
+        if unknown:
+            raise PlanValidationError(f"Filter '{node.name}' got unknown params: {sorted(unknown)}")
+        check_ranges(node)
+        if node.name == 'format' and not isinstance(node.params.get('pix_fmts'), str):
+            raise PlanValidationError("Filter 'format' needs a constant pix_fmts")
+    for slot in plan.slots().values():
+        slot.sampler.validate(slot.name)
+
+
+# --- Optimization passes ------------------------------------------------------
+
+def _is_identity(node: FilterNode) -> bool:
+    if node.name == 'eq':
+        return all(EQ_DEFAULTS[k] == v for k, v in node.params.items())
+    if node.name == 'noise':
+        return node.params.get('alls', 0) == 0
+    return False
+
+
+def eliminate_identity_filters(filters: List[FilterNode]) -> List[FilterNode]:
+    return [node for node in filters if not _is_identity(node)]
+
+
+def hoist_crops(filters: List[FilterNode]) -> List[FilterNode]:
+    """
+    Moves each crop ahead of the pointwise filters before it, so eq/noise
+    process the smaller frame. eq output is unchanged; noise is resampled
+    per pixel either way, so only its random pattern differs.
+    """
+    result: List[FilterNode] = []
+    for node in filters:
+        if node.name != 'crop':
+            result.append(node)
+            continue
+        pos = len(result)
+        while pos > 0 and FILTER_SPECS[result[pos - 1].name].pointwise:
+            pos -= 1
+        result.insert(pos, node)
+    return result
+
+
+def _add(a: Any, b: Any) -> Any:
+    if a == 0:
+        return b
+    if b == 0:
+        return a
+    return Sum((a, b))
+
+
+def _mul(a: Any, b: Any) -> Any:
+    if a == 1:
+        return b
+    if b == 1:
+        return a
+    return Product((a, b))
+
+
+def _fuse_eq(first: FilterNode, second: FilterNode) -> Optional[FilterNode]:
+    # eq maps luma as (v - 0.5) * contrast + 0.5 + brightness, then applies
+    # gamma, so the first node must have no gamma for the linear parts to
+    # compose: contrast = c1 * c2, brightness = b1 * c2 + b2,
+    # saturation = s1 * s2. This is approximate, not exact: each unfused eq
+    # clips to [0, 1] and rounds to 8 bits, so pixels the first node
+    # saturates and the second brings back differ, and others may be off by
+    # one. The color step leaves gamma to the gamma step, so consecutive
+    # color steps fuse, and a trailing gamma step folds into them.
+    if first.params.get('gamma', 1.0) != 1.0:
+        return None
+    p1 = {**EQ_DEFAULTS, **first.params}
+    p2 = {**EQ_DEFAULTS, **second.params}
+    params = {
+        'brightness': _add(_mul(p1['brightness'], p2['contrast']), p2['brightness']),
+        'contrast': _mul(p1['contrast'], p2['contrast']),
+        'saturation': _mul(p1['saturation'], p2['saturation']),
+        'gamma': p2['gamma'],
+    }
+    return FilterNode('eq', {k: v for k, v in params.items() if v != EQ_DEFAULTS[k]})
+
+
+def _fuse_crop(first: FilterNode, second: FilterNode) -> Optional[FilterNode]:
+    # Only inset crops (w=iw-m, h=ih-n with explicit offsets) compose
+    # without rewriting ffmpeg expressions. Without exact=1 ffmpeg rounds
+    # offsets down to the chroma grid per crop (1 + 1 -> 0 on yuv420p, but
+    # a fused 2 stays 2), so inexact crops are left alone.
+    for node in (first, second):
+        if node.params.get('exact') != 1:
+            return None
+        w, h = node.params.get('w'), node.params.get('h')
+        if not (isinstance(w, Inset) and w.base == 'iw' and isinstance(h, Inset) and h.base == 'ih'):
+            return None
+        if 'x' not in node.params or 'y' not in node.params:
+            return None
+    return FilterNode('crop', {
+        'w': Inset('iw', Sum((first.params['w'].margin, second.params['w'].margin))),
+        'h': Inset('ih', Sum((first.params['h'].margin, second.params['h'].margin))),
+        'x': Sum((first.params['x'], second.params['x'])),
+        'y': Sum((first.params['y'], second.params['y'])),
+        'exact': 1,
+    })
+
+
+FUSION_RULES = {
+    ('eq', 'eq'): _fuse_eq,
+    ('crop', 'crop'): _fuse_crop,
+}
+
+
+def _within_ranges(node: FilterNode) -> bool:
+    # Each unfused filter clips its own output, so a chain that is valid
+    # node by node may still fuse into params ffmpeg would reject.
+    try:
+        check_ranges(node)
+    except PlanValidationError:
+        return False
+    return True
+
+
+def fuse_filters(filters: List[FilterNode]) -> List[FilterNode]:
+    result: List[FilterNode] = []
+    for node in filters:
+        if result:
+            rule = FUSION_RULES.get((result[-1].name, node.name))
+            fused = rule(result[-1], node) if rule else None
+            if fused is not None and _within_ranges(fused):
+                result[-1] = fused
+                continue
+        result.append(node)
+    return result
+
+
+def minimize_format_conversions(filters: List[FilterNode]) -> List[FilterNode]:
+    """
+    Drops format nodes that are overridden or already satisfied, then moves
+    each remaining one ahead of the format-independent filters (eq) that
+    accept its format. Otherwise ffmpeg may convert once for eq and again
+    for the format node. Noise is not crossed: its output depends on the
+    planes and subsampling it runs on.
+    """
+    result: List[FilterNode] = []
+    current = None
+    for node in filters:
+        if node.name == 'format':
+            fmt = node.params['pix_fmts']
+            if fmt == current:
+                continue
+            if result and result[-1].name == 'format':
+                result.pop()
+            current = fmt
+        result.append(node)
+
+    hoisted: List[FilterNode] = []
+    for node in result:
+        if node.name != 'format':
+            hoisted.append(node)
+            continue
+        fmt = node.params['pix_fmts']
+        pos = len(hoisted)
+        while pos > 0:
+            spec = FILTER_SPECS[hoisted[pos - 1].name]
+            if not spec.format_independent or (spec.pix_fmts is not None and fmt not in spec.pix_fmts):
+                break
+            pos -= 1
+        hoisted.insert(pos, node)
+    return hoisted
+
+
+OPTIMIZATION_PASSES = (
+    eliminate_identity_filters,
+    hoist_crops,
+    fuse_filters,
+    minimize_format_conversions,
+)
+
+
+def optimize_plan(plan: FilterGraphPlan) -> FilterGraphPlan:
+    filters = list(plan.filters)
+    for optimization in OPTIMIZATION_PASSES:
+        filters = optimization(filters)
+    return FilterGraphPlan(plan.profile_name, filters, dict(plan.output_params))
+
+
+# --- Compilation --------------------------------------------------------------
+
+def resolve_profile_config(profile_name: str, profile_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    if profile_name not in PROFILES:
+        raise PlanValidationError(f"Unknown profile '{profile_name}'")
+    config = json.loads(json.dumps(PROFILES[profile_name]))
+    for key, value in (profile_config or {}).items():
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            config[key].update(value)
+        else:
+            config[key] = value
+    return config
+
+
+def compile_steps(profile_name: str, config: Dict[str, Any]) -> FilterGraphPlan:
+    filters: List[FilterNode] = []
+    output_params: Dict[str, Any] = dict(config.get('output_params', {}))
+    for index, step_name in enumerate(config.get('steps', [])):
+        step_cls = STEP_REGISTRY.get(step_name)
+        if step_cls is None:
+            raise PlanValidationError(f"Unknown step '{step_name}'")
+        ir: StepIR = step_cls().compile(config).namespaced(f"{index}.{step_name}")
+        filters.extend(ir.filters)
+        output_params.update(ir.output_params)
+    if config.get('pix_fmt'):
+        filters.append(FilterNode('format', {'pix_fmts': config['pix_fmt']}))
+    return FilterGraphPlan(profile_name, filters, output_params)
+
+
+def compile_plan(profile_name: str, profile_config: Optional[Dict[str, Any]] = None) -> FilterGraphPlan:
+    """
+    Compiles a profile into a validated, optimized plan. Uncached.
+    """
+    config = resolve_profile_config(profile_name, profile_config)
+    plan = compile_steps(profile_name, config)
+    validate_plan(plan)
+    plan = optimize_plan(plan)
+    validate_plan(plan)
+    return plan
+
+
+@lru_cache(maxsize=128)
+def _compile_cached(profile_name: str, config_key: str) -> FilterGraphPlan:
+    return compile_plan(profile_name, json.loads(config_key))
+
+
+def compile_profile(profile_name: str, profile_config: Optional[Dict[str, Any]] = None) -> FilterGraphPlan:
+    """
+    Returns the compiled plan for a profile, memoized per (name, config).
+    The returned plan is shared; bind it per job instead of modifying it.
+    """
+    return _compile_cached(profile_name, json.dumps(profile_config or {}, sort_keys=True))
@@ -0,0 +1,193 @@
+import random
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+
+class PlanValidationError(ValueError):
+    pass
+
+
+# --- Parameter values -------------------------------------------------------
+# A parameter is either a plain constant or one of the value nodes below.
+# Slots are sampled once per job when a compiled plan is bound, so a cached
+# plan can be shared between jobs while every output stays randomized.
+
+@dataclass(frozen=True)
+class Uniform:
+    low: float
+    high: float
+
+    def sample(self, rng: random.Random) -> float:
+        return rng.uniform(self.low, self.high)
+
+    def validate(self, name: str):
+        if self.low > self.high:
+            raise PlanValidationError(f"Slot '{name}': low {self.low} > high {self.high}")
+
+
+@dataclass(frozen=True)
+class RandInt:
+    low: int
+    high: int
+
+    def sample(self, rng: random.Random) -> int:
+        return rng.randint(self.low, self.high)
+
+    def validate(self, name: str):
+        if self.low > self.high:
+            raise PlanValidationError(f"Slot '{name}': low {self.low} > high {self.high}")
+
+
+@dataclass(frozen=True)
+class Slot:
+    name: str
+    sampler: Any
+
+
+@dataclass(frozen=True)
+class Sum:
+    terms: Tuple[Any, ...]
+
+
+@dataclass(frozen=True)
+class Product:
+    factors: Tuple[Any, ...]
+
+
+@dataclass(frozen=True)
+class Template:
+    """Formats resolved ``args`` into ``fmt`` (e.g. ffmpeg expressions)."""
+    fmt: str
+    args: Tuple[Any, ...]
+
+
+@dataclass(frozen=True)
+class Inset:
+    """Frame dimension reduced by a margin, rendered as ``<base>-<margin>``."""
+    base: str
+    margin: Any
+
+
+def iter_slots(value: Any):
+    if isinstance(value, Slot):
+        yield value
+    elif isinstance(value, Sum):
+        for term in value.terms:
+            yield from iter_slots(term)
+    elif isinstance(value, Product):
+        for factor in value.factors:
+            yield from iter_slots(factor)
+    elif isinstance(value, Template):
+        for arg in value.args:
+            yield from iter_slots(arg)
+    elif isinstance(value, Inset):
+        yield from iter_slots(value.margin)
+
+
+def namespace(value: Any, prefix: str) -> Any:
+    """Returns ``value`` with every slot name prefixed by ``prefix``."""
+    if isinstance(value, Slot):
+        return Slot(f"{prefix}.{value.name}", value.sampler)
+    if isinstance(value, Sum):
+        return Sum(tuple(namespace(t, prefix) for t in value.terms))
+    if isinstance(value, Product):
+        return Product(tuple(namespace(f, prefix) for f in value.factors))
+    if isinstance(value, Template):
+        return Template(value.fmt, tuple(namespace(a, prefix) for a in value.args))
+    if isinstance(value, Inset):
+        return Inset(value.base, namespace(value.margin, prefix))
+    return value
+
+
+def resolve(value: Any, bindings: Dict[str, Any]) -> Any:
+    if isinstance(value, Slot):
+        return bindings[value.name]
+    if isinstance(value, Sum):
+        return sum(resolve(t, bindings) for t in value.terms)
+    if isinstance(value, Product):
+        result = 1
+        for factor in value.factors:
+            result *= resolve(factor, bindings)
+        return result
+    if isinstance(value, Template):
+        return value.fmt.format(*(resolve(a, bindings) for a in value.args))
+    if isinstance(value, Inset):
+        return f"{value.base}-{resolve(value.margin, bindings)}"
+    return value
+
+
+# --- Graph --------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class FilterNode:
+    name: str
+    params: Mapping[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'params', MappingProxyType(dict(self.params)))
+
+    def slots(self):
+        for value in self.params.values():
+            yield from iter_slots(value)
+
+    def bind(self, bindings: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: resolve(v, bindings) for k, v in self.params.items()}
+
+
+@dataclass
+class StepIR:
+    """Declarative output of a single step."""
+    filters: List[FilterNode] = field(default_factory=list)
+    output_params: Dict[str, Any] = field(default_factory=dict)
+
+    def namespaced(self, prefix: str) -> "StepIR":
+        return StepIR(
+            filters=[
+                FilterNode(f.name, {k: namespace(v, prefix) for k, v in f.params.items()})
+                for f in self.filters
+            ],
+            output_params={k: namespace(v, prefix) for k, v in self.output_params.items()},
+        )
+
+
+@dataclass
+class BoundPlan:
+    filters: List[Tuple[str, Dict[str, Any]]]
+    output_params: Dict[str, Any]
+    bindings: Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class FilterGraphPlan:
+    """
+    Compiled, validated filter chain for a profile.
+    Plans are cached and shared between jobs, so they are immutable;
+    use `bind` to get concrete filter arguments for a single run.
+    """
+    profile_name: str
+    filters: Tuple[FilterNode, ...]
+    output_params: Mapping[str, Any]
+
+    def __post_init__(self):
+        object.__setattr__(self, 'filters', tuple(self.filters))
+        object.__setattr__(self, 'output_params', MappingProxyType(dict(self.output_params)))
+
+    def slots(self) -> Dict[str, Slot]:
+        slots = {}
+        for node in self.filters:
+            for slot in node.slots():
+                slots[slot.name] = slot
+        for value in self.output_params.values():
+            for slot in iter_slots(value):
+                slots[slot.name] = slot
+        return slots
+
+    def bind(self, rng: Optional[random.Random] = None) -> BoundPlan:
+        rng = rng or random.Random()
+        bindings = {name: slot.sampler.sample(rng) for name, slot in sorted(self.slots().items())}
+        return BoundPlan(
+            filters=[(node.name, node.bind(bindings)) for node in self.filters],
+            output_params={k: resolve(v, bindings) for k, v in self.output_params.items()},
+            bindings=bindings,
+        )
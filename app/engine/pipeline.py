@@ -1,29 +1,40 @@
 import os
+import random
 import ffmpeg
-from typing import List
-from app.engine.steps.base import BaseStep, ProcessingContext
+from typing import Any, Dict, Optional
+from app.engine.compiler import compile_profile
+from app.engine.ir import FilterGraphPlan
+from app.engine.steps.base import ProcessingContext
 
 class Pipeline:
-    def __init__(self, steps: List[BaseStep]):
-        self.steps = steps
+    def __init__(self, plan: FilterGraphPlan):
+        self.plan = plan
 
-    def run(self, ctx: ProcessingContext) -> str:
+    @classmethod
+    def for_profile(cls, profile_name: str, profile_config: Optional[Dict[str, Any]] = None) -> "Pipeline":
+        return cls(compile_profile(profile_name, profile_config))
+
+    def run(self, ctx: ProcessingContext, rng: Optional[random.Random] = None) -> str:
         """
         Runs the pipeline and returns the path to the output file.
         """
+        # Sample this job's slot values; the compiled plan itself is shared.
+        bound = self.plan.bind(rng)
+        ctx.metadata['slots'] = bound.bindings
+
         # Start with the input file
         stream = ffmpeg.input(ctx.input_path)
         
-        # Apply all steps
-        for step in self.steps:
-            stream = step.apply(ctx, stream)
+        # Apply all filters
+        for name, params in bound.filters:
+            stream = stream.filter(name, **params)
             
         # Define output path
         output_filename = f"processed_{os.path.basename(ctx.input_path)}"
         output_path = os.path.join(ctx.temp_dir, output_filename)
         
-        # Get output parameters from config or defaults
-        output_params = ctx.config.get('output_params', {})
+        # Output parameters from the plan, overridable per run
+        output_params = {**bound.output_params, **ctx.config.get('output_params', {})}
         
         # Run ffmpeg
         # overwrite_output=True is -y
@@ -0,0 +1,33 @@
+from typing import Any, Dict, Type
+from app.core.constants import DEFAULT_PROFILE
+from app.engine.steps.base import BaseStep
+from app.engine.steps.ffmpeg_steps import (
+    MetadataMutationStep,
+    NoiseInjectionStep,
+    ColorModulationStep,
+    GammaModulationStep,
+    GeometricTransformStep
+)
+
+STEP_REGISTRY: Dict[str, Type[BaseStep]] = {
+    'metadata': MetadataMutationStep,
+    'color': ColorModulationStep,
+    'gamma': GammaModulationStep,
+    'noise': NoiseInjectionStep,
+    'geometry': GeometricTransformStep,
+}
+
+# Job.profile_config is merged over the profile's config; it may also
+# override 'steps' to reorder or drop steps.
+PROFILES: Dict[str, Dict[str, Any]] = {
+    DEFAULT_PROFILE: {
+        'steps': ['metadata', 'color', 'gamma', 'noise', 'geometry'],
+        'noise_intensity': 5,
+        'pix_fmt': 'yuv420p',
+        'output_params': {
+            'c:v': 'libx264',
+            'crf': 23,
+            'preset': 'fast'
+        }
+    },
+}
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict
-import ffmpeg
+from app.engine.ir import StepIR
 
 class ProcessingContext:
     def __init__(self, input_path: str, temp_dir: str, config: Dict[str, Any]):
@@ -11,11 +11,11 @@ class ProcessingContext:
 
 class BaseStep(ABC):
     @abstractmethod
-    def apply(self, ctx: ProcessingContext, stream: Any) -> Any:
+    def compile(self, config: Dict[str, Any]) -> StepIR:
         """
-        Applies a transformation to the ffmpeg stream.
-        :param ctx: Processing context
-        :param stream: ffmpeg-python stream object
-        :return: Modified stream object
+        Describes the step as filter nodes and output parameters.
+        Must not touch ffmpeg or mutate `config`; randomness goes into slots.
+        :param config: Resolved profile config
+        :return: Step IR
         """
         pass
@@ -6,12 +6,7 @@ from app.db.session import AsyncSessionLocal
 from app.db.models import Job, JobStatus
 from app.services.storage import StorageService
 from app.engine.pipeline import Pipeline, ProcessingContext
-from app.engine.steps.ffmpeg_steps import (
-    MetadataMutationStep, 
-    NoiseInjectionStep, 
-    ColorModulationStep,
-    GeometricTransformStep
-)
+from app.core.constants import DEFAULT_PROFILE
 from app.engine.analyzer import VideoHasher
 from sqlalchemy import select
 
@@ -58,26 +53,10 @@ def process_video_task(self, job_id_str: str):
         orig_md5 = VideoHasher.calculate_file_hash(input_path)
         orig_phash = VideoHasher.calculate_perceptual_hashes(input_path)
         
-        # 4. Build Pipeline
-        steps = [
-            MetadataMutationStep(),
-            ColorModulationStep(),
-            NoiseInjectionStep(),
-            GeometricTransformStep()
-        ]
+        # 4. Build Pipeline (compiled plans are cached per profile)
+        pipeline = Pipeline.for_profile(job.profile_name or DEFAULT_PROFILE, job.profile_config)
         
-        pipeline = Pipeline(steps)
-        
-        config = {
-            'noise_intensity': 5,
-            'output_params': {
-                'c:v': 'libx264',
-                'crf': 23,
-                'preset': 'fast'
-            }
-        }
-        
-        ctx = ProcessingContext(input_path, temp_dir, config)
+        ctx = ProcessingContext(input_path, temp_dir, {})
         
         # 5. Run Pipeline
         output_path = pipeline.run(ctx)
@@ -0,0 +1,136 @@
+import dataclasses
+import random
+
+import pytest
+
+from app.engine.compiler import (
+    _interval,
+    compile_plan,
+    compile_profile,
+    fuse_filters,
+    hoist_crops,
+    minimize_format_conversions,
+)
+from app.engine.ir import FilterNode, Inset, PlanValidationError, Slot, Uniform
+
+
+def _format(pix_fmt):
+    return FilterNode('format', {'pix_fmts': pix_fmt})
+
+
+def _crop(margin_w, margin_h, x, y, **extra):
+    return FilterNode('crop', {
+        'w': Inset('iw', margin_w), 'h': Inset('ih', margin_h), 'x': x, 'y': y, **extra,
+    })
+
+
+def test_default_profile_node_order():
+    plan = compile_plan('default')
+    assert [node.name for node in plan.filters] == ['crop', 'eq', 'noise', 'format']
+
+
+def test_crop_fusion_sums_margins_and_offsets():
+    fused = fuse_filters([_crop(2, 4, 1, 2, exact=1), _crop(4, 2, 2, 1, exact=1)])
+    assert len(fused) == 1
+    assert fused[0].bind({}) == {'w': 'iw-6', 'h': 'ih-6', 'x': 3, 'y': 3, 'exact': 1}
+
+
+def test_inexact_crops_are_not_fused():
+    assert len(fuse_filters([_crop(2, 2, 1, 1), _crop(2, 2, 1, 1)])) == 2
+
+
+def test_color_steps_fuse_into_one_eq():
+    plan = compile_plan('default', {'steps': ['color', 'geometry', 'color', 'geometry', 'noise']})
+    assert [node.name for node in plan.filters] == ['crop', 'eq', 'noise', 'format']
+
+
+def test_eq_with_gamma_first_is_not_fused():
+    gamma = FilterNode('eq', {'gamma': 1.02})
+    color = FilterNode('eq', {'contrast': 1.02})
+    assert len(fuse_filters([gamma, color])) == 2
+    fused = fuse_filters([color, gamma])
+    assert fused == [FilterNode('eq', {'contrast': 1.02, 'gamma': 1.02})]
+
+
+def test_interval_bounds_slots_and_skips_non_numeric():
+    assert _interval(Slot('s', Uniform(-0.5, 0.5))) == (-0.5, 0.5)
+    assert _interval('5') is None
+
+
+def test_out_of_range_intensity_is_rejected():
+    with pytest.raises(PlanValidationError, match='alls range'):
+        compile_plan('default', {'noise_intensity': 500})
+
+
+@pytest.mark.parametrize('intensity', ['5', '500', None])
+def test_non_numeric_intensity_is_rejected(intensity):
+    with pytest.raises(PlanValidationError, match='must be numeric'):
+        compile_plan('default', {'noise_intensity': intensity})
+
+
+def test_compile_profile_is_memoized():
+    assert compile_profile('default', None) is compile_profile('default', {})
+
+
+def test_compiled_plan_is_immutable():
+    plan = compile_profile('default')
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        plan.filters = ()
+    with pytest.raises(TypeError):
+        plan.filters[0].params['x'] = 0
+
+
+def test_bind_is_reproducible_with_seeded_rng():
+    plan = compile_profile('default')
+    first = plan.bind(random.Random(42))
+    second = plan.bind(random.Random(42))
+    assert first.filters == second.filters
+    assert first.output_params == second.output_params
+
+
+@pytest.mark.parametrize('profile_name, profile_config', [
+    ('missing', None),
+    ('default', {'steps': ['color', 'missing']}),
+])
+def test_unknown_profile_or_step_raises(profile_name, profile_config):
+    with pytest.raises(PlanValidationError):
+        compile_plan(profile_name, profile_config)
+
+
+def test_long_color_chain_fuses_only_within_eq_ranges():
+    plan = compile_plan('default', {'steps': ['color'] * 23})
+    eq_nodes = [node for node in plan.filters if node.name == 'eq']
+    assert 1 < len(eq_nodes) < 23
+
+
+def test_fractional_intensity_is_rejected():
+    with pytest.raises(PlanValidationError, match='must be an integer'):
+        compile_plan('default', {'noise_intensity': 5.5})
+
+
+def test_format_stays_behind_eq_that_cannot_take_it():
+    plan = compile_plan('default', {'steps': ['color'], 'pix_fmt': 'rgb24'})
+    assert [node.name for node in plan.filters] == ['eq', 'format']
+
+
+def test_format_moves_ahead_of_eq_but_not_noise():
+    eq = FilterNode('eq', {'contrast': 1.02})
+    noise = FilterNode('noise', {'alls': 5})
+    assert minimize_format_conversions([eq, _format('yuv420p')]) == [_format('yuv420p'), eq]
+    assert minimize_format_conversions([eq, noise, _format('gbrp')]) == [eq, noise, _format('gbrp')]
+
+
+def test_consecutive_format_nodes_keep_the_last():
+    assert minimize_format_conversions([_format('yuv444p'), _format('yuv420p')]) == [_format('yuv420p')]
+
+
+def test_duplicate_format_node_is_dropped():
+    noise = FilterNode('noise', {'alls': 5})
+    filters = [_format('yuv420p'), noise, _format('yuv420p')]
+    assert minimize_format_conversions(filters) == [_format('yuv420p'), noise]
+
+
+def test_crop_is_not_hoisted_past_non_pointwise_node():
+    eq = FilterNode('eq', {'contrast': 1.02})
+    crop = _crop(2, 2, 1, 1, exact=1)
+    assert hoist_crops([eq, _format('yuv420p'), eq, crop]) == [eq, _format('yuv420p'), crop, eq]
@@ -0,0 +1,23 @@
+import random
+
+import ffmpeg
+
+from app.engine.pipeline import Pipeline
+from app.engine.steps.base import ProcessingContext
+
+
+def test_run_merges_plan_and_context_output_params(monkeypatch, tmp_path):
+    commands = []
+    monkeypatch.setattr(ffmpeg.nodes.OutputStream, 'run',
+                        lambda stream, **kwargs: commands.append(ffmpeg.get_args(stream)))
+    ctx = ProcessingContext('input.mp4', str(tmp_path), {'output_params': {'crf': 18}})
+
+    output_path = Pipeline.for_profile('default').run(ctx, random.Random(0))
+
+    args = commands[0]
+    assert output_path == str(tmp_path / 'processed_input.mp4')
+    assert args[args.index('-crf') + 1] == '18'
+    assert args[args.index('-c:v') + 1] == 'libx264'
+    assert args[args.index('-map_metadata') + 1] == '-1'
+    assert args[args.index('-metadata:g:0') + 1].startswith('comment=Processed_')
+    assert set(ctx.metadata['slots']) == set(Pipeline.for_profile('default').plan.slots())